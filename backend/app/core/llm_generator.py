@@ -1,72 +1,215 @@
 # backend/app/core/llm_generator.py - IMPROVED VERSION
 
+import asyncio
+import hashlib
 import json
+import logging
 import os
+import random
+import re
+from functools import lru_cache
+from string import Template
 from typing import Dict, List, Tuple, Optional
 from google import genai
+from google.genai import errors as genai_errors
 from google.genai import types
 from io import BytesIO
-
-from app.models.analysis_models import LLMFeedback, GeminiAllDetection 
+from PIL import Image
+from cachetools import TTLCache
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional speedup; stdlib json still works
+    orjson = None
+
+from pydantic import ValidationError
+
+from app.models.analysis_models import LLMFeedback, GeminiAllDetection, FaceDict
+
+# Child of the app logger wired in main: records funnel through the same
+# QueueHandler off the event loop. Cache hits and batching decisions are
+# DEBUG; degraded-but-recovered paths are WARNING.
+logger = logging.getLogger("thumblytics.llm_generator")
+
+# The single canonical module surface — star-imports and reviewers both see
+# exactly what callers are meant to use.
+__all__ = [
+    "get_clean_schema_for_gemini",
+    "get_all_detection_data",
+    "generate_final_feedback",
+    "generate_final_feedback_stream",
+    "upload_image_for_analysis",
+    "delete_uploaded_image",
+]
 
 # --- Constants & Initialization ---
-API_KEY = os.getenv("GEMINI_API_KEY")
-if not API_KEY:
-    raise ValueError("GEMINI_API_KEY environment variable is not set")
-client = genai.Client(api_key=API_KEY)
+# The client is created lazily, once per process. Building it at import time
+# opens HTTP connections in the parent that fork-based workers (Gunicorn/
+# Uvicorn --preload) would then share broken copies of.
+_client: Optional[genai.Client] = None
+
+
+def _get_client() -> genai.Client:
+    """Returns the per-process Gemini client, creating it on first use."""
+    global _client
+    if _client is None:
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY environment variable is not set")
+        # One shared httpx pool per process; a bounded timeout keeps a hung
+        # Gemini call from pinning a connection forever.
+        _client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(timeout=30_000)
+        )
+    return _client
+
+
+def _reset_client_after_fork():
+    """Drops the inherited client (and batcher state) so each forked worker
+    builds its own — queues and tasks are bound to the parent's event loop."""
+    global _client, _detection_queue, _batcher_task
+    _client = None
+    _detection_queue = None
+    _batcher_task = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_client_after_fork)
+
+
+# Content-addressed response caches. The detectors are pure with respect to
+# (image bytes, prompt, schema), so re-analysis of the same thumbnail can skip
+# the network + inference cost entirely within the TTL window.
+_CACHE_TTL_SECONDS = 86_400
+_DETECTION_CACHE: TTLCache = TTLCache(maxsize=256, ttl=_CACHE_TTL_SECONDS)
+_FEEDBACK_CACHE: TTLCache = TTLCache(maxsize=256, ttl=_CACHE_TTL_SECONDS)
+
+
+def _image_cache_key(image_bytes: bytes) -> str:
+    """Content hash of the image, used to key the response caches."""
+    return hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+
+
+# Cap on simultaneous in-flight Gemini calls. Unbounded fan-out under load
+# trips the account's QPS quota and turns into cascading 429 -> fallback
+# responses; a modest bound keeps every call inside the rate limit. Tune via
+# GEMINI_CONCURRENCY to match the account's quota.
+_GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "5"))
+_GEMINI_SEM = asyncio.Semaphore(_GEMINI_CONCURRENCY)
+
+
+# Transient Gemini failures worth retrying; schema/validation errors are not.
+_RETRYABLE_STATUS_CODES = frozenset({429, 500, 503})
+_MAX_ATTEMPTS = 4
+_BACKOFF_CAP_SECONDS = 16.0
+
+
+def _retry_delay(attempt: int) -> float:
+    """Jittered exponential backoff delay for the given (1-based) attempt."""
+    base = min(2.0 ** (attempt - 1), _BACKOFF_CAP_SECONDS)
+    return base * (0.5 + random.random() / 2)
+
+
+def _is_retryable(exc: Exception) -> bool:
+    """True for rate limits and transient server errors, False otherwise."""
+    return (
+        isinstance(exc, genai_errors.APIError)
+        and exc.code in _RETRYABLE_STATUS_CODES
+    )
+
+
+async def _generate_with_retry(**kwargs):
+    """
+    Calls the async Gemini API with exponential backoff on 429/5xx.
+    Non-transient errors (schema problems, auth) surface immediately so the
+    fallback path only fires for genuinely unrecoverable calls.
+    """
+    for attempt in range(1, _MAX_ATTEMPTS + 1):
+        try:
+            async with _GEMINI_SEM:
+                return await _get_client().aio.models.generate_content(**kwargs)
+        except Exception as e:
+            if not _is_retryable(e) or attempt == _MAX_ATTEMPTS:
+                raise
+            wait = _retry_delay(attempt)
+            logger.warning("⚠️ Gemini transient error (%s, attempt %d/%d) — retrying in %.1fs",
+                           type(e).__name__, attempt, _MAX_ATTEMPTS, wait)
+            await asyncio.sleep(wait)
+
+
+def _json_loads(text):
+    """Parses JSON with orjson when available (3-10x faster than stdlib)."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def _json_dumps(obj) -> str:
+    """Serializes a JSON fragment with orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
 
 
 # ----------------------------------------------------------------------
 # HELPER: Convert Pydantic model to clean JSON Schema
 # ----------------------------------------------------------------------
+# Keys Gemini rejects (or ignores badly), stripped during the clean pass
+_SCHEMA_KEYS_TO_STRIP = frozenset({"title", "additionalProperties", "default", "$defs", "$ref"})
+
+
+@lru_cache(maxsize=None)
 def get_clean_schema_for_gemini(pydantic_model):
     """
     Converts a Pydantic model to a JSON Schema dict WITHOUT $defs references.
     Aggressively removes all problematic fields that cause Gemini API errors.
+
+    $ref inlining and key stripping happen in a single pass driven by an
+    explicit worklist rather than recursion, so deeply nested model graphs
+    can never hit the interpreter's recursion limit and each node costs one
+    loop iteration instead of a Python frame. The schemas are immutable per
+    model class, so results are memoized — callers pay the
+    model_json_schema() walk exactly once per process.
     """
     schema = pydantic_model.model_json_schema()
-    
-    # Inline any $defs if they exist
-    if "$defs" in schema:
-        defs = schema.pop("$defs")
-        
-        def resolve_refs(obj):
-            if isinstance(obj, dict):
-                if "$ref" in obj:
-                    ref_path = obj["$ref"].split("/")[-1]
-                    if ref_path in defs:
-                        return resolve_refs(defs[ref_path].copy())
-                return {k: resolve_refs(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [resolve_refs(item) for item in obj]
-            return obj
-        
-        schema = resolve_refs(schema)
-    
-    # Recursively remove problematic fields
-    def clean_schema(obj):
-        if isinstance(obj, dict):
-            # Remove all problematic keys
-            keys_to_remove = [
-                "title", 
-                "additionalProperties", 
-                "default",
-                "$defs",
-                "$ref"
-            ]
-            for key in keys_to_remove:
-                obj.pop(key, None)
-            
-            # Recursively clean nested objects
-            for key, value in list(obj.items()):
-                obj[key] = clean_schema(value)
-            
-            return obj
-        elif isinstance(obj, list):
-            return [clean_schema(item) for item in obj]
-        return obj
-    
-    return clean_schema(schema)
+    defs = schema.pop("$defs", {})
+
+    # (container, key, node): clean `node` and store it at container[key]
+    root = [None]
+    stack = [(root, 0, schema)]
+    while stack:
+        container, key, node = stack.pop()
+
+        # Inline (possibly chained) $refs before cleaning the node itself
+        while isinstance(node, dict) and "$ref" in node:
+            ref_name = node["$ref"].split("/")[-1]
+            if ref_name not in defs:
+                break
+            node = defs[ref_name]
+
+        if isinstance(node, dict):
+            cleaned = {}
+            container[key] = cleaned
+            for child_key, child in node.items():
+                if child_key not in _SCHEMA_KEYS_TO_STRIP:
+                    # Insert placeholder now to keep key order stable
+                    cleaned[child_key] = None
+                    stack.append((cleaned, child_key, child))
+        elif isinstance(node, list):
+            cleaned = [None] * len(node)
+            container[key] = cleaned
+            for index, child in enumerate(node):
+                stack.append((cleaned, index, child))
+        else:
+            container[key] = node
+
+    return root[0]
+
+
+# Precomputed at import so no request pays the first schema walk.
+_ALL_DETECTION_SCHEMA = get_clean_schema_for_gemini(GeminiAllDetection)
+_FEEDBACK_SCHEMA = get_clean_schema_for_gemini(LLMFeedback)
 
 
 # ----------------------------------------------------------------------
@@ -176,24 +319,8 @@ For a thumbnail with a zombie and a person with text:
 REMEMBER: Your goal is MAXIMUM DETECTION, not minimal detection. When in doubt, INCLUDE the object."""
 
 
-def get_all_detection_data(image_bytes: bytes) -> Dict:
-    """
-    Uses Gemini to identify ALL objects, faces, and text regions.
-    Returns a clean dictionary for main.py to process.
-    
-    Args:
-        image_bytes: Raw image bytes
-    
-    Returns:
-        Dictionary containing detected_objects list and face metadata
-    """
-    image_part = types.Part.from_bytes(data=image_bytes, mime_type='image/jpeg')
-    
-    # Create clean schema
-    clean_schema = get_clean_schema_for_gemini(GeminiAllDetection)
-    
-    # IMPROVED: Add explicit user prompt to force detection
-    user_prompt = """Analyze this YouTube thumbnail image carefully. 
+# Static user prompt for the detection call — built once, reused every request.
+DETECTION_USER_PROMPT = """Analyze this YouTube thumbnail image carefully.
 
 MANDATORY TASKS:
 1. Identify and locate EVERY visible object, character, person, and text region
@@ -201,123 +328,384 @@ MANDATORY TASKS:
 3. Provide bounding boxes for ALL elements you can see
 4. For any faces/people, specify their emotion
 
-START your analysis by describing what you see, then provide the JSON with ALL detections.
+Respond with ONLY the JSON object containing ALL detections — no commentary before or after it.
 
 Remember: Empty detected_objects array is ONLY acceptable if the image is completely blank."""
-    
-    config = types.GenerateContentConfig(
+
+
+# Resized payloads keyed by content hash, so a request that hits both Gemini
+# calls (and any cached re-analysis) only pays the Pillow decode/encode once.
+_SHRUNK_CACHE: TTLCache = TTLCache(maxsize=64, ttl=_CACHE_TTL_SECONDS)
+
+
+def _shrink_for_gemini(image_bytes: bytes, max_side: int = 768, quality: int = 80) -> bytes:
+    """
+    Downscales/re-encodes the input JPEG before it goes over the wire.
+    Gemini's vision model downsamples internally anyway, so sending a
+    full-resolution 1280x720+ thumbnail only wastes upload bytes and
+    server-side decode time. Falls back to the original bytes if Pillow
+    cannot decode the input.
+    """
+    cache_key = _image_cache_key(image_bytes)
+    cached = _SHRUNK_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+    try:
+        img = Image.open(BytesIO(image_bytes))
+        if max(img.size) <= max_side:
+            shrunk = image_bytes
+        else:
+            img = img.convert('RGB')
+            img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+            buf = BytesIO()
+            img.save(buf, 'JPEG', quality=quality, optimize=True)
+            shrunk = buf.getvalue()
+    except Exception as e:
+        logger.warning("⚠️ Image pre-resize failed, sending original bytes: %s", e)
+        shrunk = image_bytes
+    _SHRUNK_CACHE[cache_key] = shrunk
+    return shrunk
+
+
+def _make_image_part(image_bytes: bytes) -> types.Part:
+    """Wraps raw JPEG bytes as a Gemini Part. Single construction point so a
+    request that hits both Gemini calls can build the part once and reuse it."""
+    return types.Part.from_bytes(data=image_bytes, mime_type='image/jpeg')
+
+
+async def upload_image_for_analysis(image_bytes: bytes) -> Optional[types.File]:
+    """
+    Uploads the (downscaled) thumbnail once via the Gemini Files API so both
+    Gemini calls can reference the same server-side handle instead of
+    re-sending the JPEG inline twice per request. Returns None on failure,
+    in which case callers fall back to inline bytes.
+    """
+    try:
+        return await _get_client().aio.files.upload(
+            file=BytesIO(_shrink_for_gemini(image_bytes)),
+            config={'mime_type': 'image/jpeg'}
+        )
+    except Exception as e:
+        logger.warning("⚠️ Files API upload failed, falling back to inline bytes: %s", e)
+        return None
+
+
+async def delete_uploaded_image(uploaded: types.File) -> None:
+    """Deletes a Files API handle once the request chain is done with it."""
+    try:
+        await _get_client().aio.files.delete(name=uploaded.name)
+    except Exception as e:
+        logger.warning("⚠️ Files API delete failed (handle expires server-side): %s", e)
+
+
+def _empty_detection_result() -> Dict:
+    """Returns a fresh empty detection payload for the error paths.
+
+    Carries a private failure marker so callers can tell an outage apart
+    from a genuinely blank image — degraded results must not end up in
+    long-lived caches, where they would poison the image for the TTL.
+    """
+    return {
+        "detected_objects": [],
+        "face_count": 0,
+        "detected_emotion": None,
+        "_detection_failed": True
+    }
+
+
+# --- Detection micro-batching ---
+# Under burst load each request fired its own detection call. Gemini accepts
+# multi-image prompts, so a tiny background batcher coalesces up to
+# _BATCH_SIZE requests that arrive within _BATCH_WINDOW_SECONDS into one
+# call, amortizing HTTP/TLS overhead and quota units. A lone request costs
+# at most the window (25 ms by default) in added latency. Both knobs are
+# env-tunable so deployments can trade latency for throughput.
+_BATCH_SIZE = int(os.getenv("GEMINI_BATCH_SIZE", "4"))
+_BATCH_WINDOW_SECONDS = float(os.getenv("GEMINI_BATCH_WINDOW_MS", "25")) / 1000.0
+
+_detection_queue: Optional[asyncio.Queue] = None
+_batcher_task: Optional[asyncio.Task] = None
+
+# Batched response: one detection object per input image, in input order.
+_BATCH_DETECTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "results": {"type": "array", "items": _ALL_DETECTION_SCHEMA}
+    },
+    "required": ["results"],
+}
+
+
+def _detection_config(response_schema: Dict, max_output_tokens: int) -> types.GenerateContentConfig:
+    """Shared generation settings for single and batched detection calls."""
+    return types.GenerateContentConfig(
         system_instruction=DETECTION_SYSTEM_INSTRUCTION,
         response_mime_type="application/json",
-        response_schema=clean_schema,
+        response_schema=response_schema,
         temperature=0.1,  # Lower temperature for more consistent detection
         top_p=0.95,
-        top_k=40
+        top_k=40,
+        max_output_tokens=max_output_tokens
     )
 
-    try:
-        response = client.models.generate_content(
-            model='gemini-2.0-flash-exp',
-            contents=[image_part, user_prompt],  # Added explicit prompt
-            config=config
+
+def _postprocess_detection(result: Dict) -> Dict:
+    """Normalizes one raw detection dict: backfills face count and emotion."""
+    # Ensure the result has the expected structure
+    if "detected_objects" not in result:
+        logger.warning("⚠️ Gemini returned result without 'detected_objects' key")
+        result["detected_objects"] = []
+
+    # WARNING: If no objects detected, log it prominently
+    if len(result["detected_objects"]) == 0:
+        logger.warning(
+            "⚠️ Gemini returned ZERO detected objects — likely a detection failure "
+            "(corrupt image, API issues, or incompatible format)"
         )
-        
-        result = json.loads(response.text)
-        
-        # Ensure the result has the expected structure
-        if "detected_objects" not in result:
-            print("⚠️ Gemini returned result without 'detected_objects' key")
-            result["detected_objects"] = []
-        
-        # WARNING: If no objects detected, log it prominently
-        if len(result["detected_objects"]) == 0:
-            print("⚠️⚠️⚠️ WARNING: Gemini returned ZERO detected objects!")
-            print("⚠️⚠️⚠️ This likely indicates a detection failure. Consider:")
-            print("   1. Image may be corrupted or unreadable")
-            print("   2. Gemini API may be having issues")
-            print("   3. Image format may not be compatible")
-        
-        # Calculate face count and dominant emotion from detected objects
-        faces = [
-            obj for obj in result["detected_objects"] 
-            if obj.get("label", "").lower() in ["face", "person", "human"]
-        ]
-        result["face_count"] = len(faces)
-        
-        # Get dominant emotion from the first face if available
-        dominant_emotion = None
-        if faces:
-            # Prioritize faces with emotions
-            for face in faces:
-                if face.get("emotion") and face["emotion"].lower() != "neutral":
-                    dominant_emotion = face["emotion"]
-                    break
-            # Fallback to first face emotion if all are neutral
-            if not dominant_emotion and faces[0].get("emotion"):
-                dominant_emotion = faces[0]["emotion"]
-        
-        result["detected_emotion"] = dominant_emotion
-        
-        print(f"✅ Gemini detection successful: {len(result['detected_objects'])} objects, {result['face_count']} faces")
-        if faces:
-            print(f"   👤 Faces detected with emotions: {[f.get('emotion', 'Unknown') for f in faces]}")
-        
-        # Log all detected objects for debugging
-        if result['detected_objects']:
-            print(f"   🎯 All detected elements:")
-            for obj in result['detected_objects']:
-                label = obj.get('label', 'unknown')
-                confidence = obj.get('confidence', 0)
-                bbox = obj.get('bbox_normalized', [])
-                print(f"      - {label} (confidence: {confidence:.2f}, bbox: {bbox})")
+
+    # Calculate face count and dominant emotion from detected objects
+    faces = [
+        obj for obj in result["detected_objects"]
+        if obj.get("label", "").lower() in ["face", "person", "human"]
+    ]
+    result["face_count"] = len(faces)
+
+    # Get dominant emotion from the first face if available
+    dominant_emotion = None
+    if faces:
+        # Prioritize faces with emotions
+        for face in faces:
+            if face.get("emotion") and face["emotion"].lower() != "neutral":
+                dominant_emotion = face["emotion"]
+                break
+        # Fallback to first face emotion if all are neutral
+        if not dominant_emotion and faces[0].get("emotion"):
+            dominant_emotion = faces[0]["emotion"]
+
+    result["detected_emotion"] = dominant_emotion
+
+    logger.debug("✅ Gemini detection successful: %d objects, %d faces",
+                 len(result['detected_objects']), result['face_count'])
+    if faces and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("   👤 Face emotions: %s", [f.get('emotion', 'Unknown') for f in faces])
+
+    return result
+
+
+async def _detect_single(image_part) -> Dict:
+    """Runs the combined detection call for one image."""
+    response = await _generate_with_retry(
+        model='gemini-2.0-flash-exp',
+        contents=[image_part, DETECTION_USER_PROMPT],
+        config=_detection_config(_ALL_DETECTION_SCHEMA, 4096)
+    )
+
+    # The SDK already parses structured output against response_schema;
+    # only fall back to decoding the text when .parsed is unavailable.
+    parsed = response.parsed
+    result = parsed if isinstance(parsed, dict) else _json_loads(response.text)
+    return _postprocess_detection(result)
+
+
+async def _detect_batch(image_parts: list) -> List[Dict]:
+    """Runs one multi-image detection call and splits out per-image results."""
+    batch_prompt = (
+        f"You are given {len(image_parts)} separate thumbnail images. "
+        "Analyze EACH image independently and respond with a JSON object whose "
+        "'results' array contains exactly one detection object per image, in "
+        "the same order the images were provided.\n\n"
+        + DETECTION_USER_PROMPT
+    )
+    response = await _generate_with_retry(
+        model='gemini-2.0-flash-exp',
+        contents=[*image_parts, batch_prompt],
+        # Clamped to the model's 8192 output-token cap: scaling linearly past
+        # it gets the whole call rejected for batches of 3+, exactly under
+        # the burst load batching exists for. Detection JSON is compact, so
+        # the shared budget still comfortably covers a full batch.
+        config=_detection_config(
+            _BATCH_DETECTION_SCHEMA, min(4096 * len(image_parts), 8192)
+        )
+    )
+
+    parsed = response.parsed
+    payload = parsed if isinstance(parsed, dict) else _json_loads(response.text)
+    raw_results = payload.get("results", [])
+    if len(raw_results) != len(image_parts):
+        logger.warning("⚠️ Batched detection returned %d results for %d images — padding with empties",
+                       len(raw_results), len(image_parts))
+
+    results = []
+    for index in range(len(image_parts)):
+        raw = raw_results[index] if index < len(raw_results) and isinstance(raw_results[index], dict) else _empty_detection_result()
+        results.append(_postprocess_detection(raw))
+    return results
+
+
+async def _dispatch_batch(batch) -> None:
+    """Runs one collected batch and resolves its callers' futures."""
+    try:
+        if len(batch) == 1:
+            results = [await _detect_single(batch[0][0])]
         else:
-            print("   ⚠️ NO OBJECTS DETECTED - This may indicate an issue")
-        
+            logger.debug("📦 Coalescing %d detection requests into one Gemini call", len(batch))
+            results = await _detect_batch([part for part, _ in batch])
+    except Exception as e:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(e)
+        return
+
+    for (_, future), result in zip(batch, results):
+        if not future.done():
+            future.set_result(result)
+
+
+async def _batch_worker():
+    """Drains the detection queue, coalescing near-simultaneous requests."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await _detection_queue.get()]
+        deadline = loop.time() + _BATCH_WINDOW_SECONDS
+        while len(batch) < _BATCH_SIZE:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_detection_queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        # Fire-and-track rather than await inline: awaiting here would cap
+        # detections at one in-flight call per process (head-of-line
+        # blocking), leaving _GEMINI_SEM's budget unreachable. The dispatch
+        # task resolves the callers' futures; the worker goes straight back
+        # to draining the queue.
+        asyncio.create_task(_dispatch_batch(batch))
+
+
+async def _submit_detection(image_part) -> Dict:
+    """Queues one image for detection and awaits its per-image result."""
+    global _detection_queue, _batcher_task
+    loop = asyncio.get_running_loop()
+    if _batcher_task is None or _batcher_task.done():
+        _detection_queue = asyncio.Queue()
+        _batcher_task = loop.create_task(_batch_worker())
+    future = loop.create_future()
+    await _detection_queue.put((image_part, future))
+    return await future
+
+
+async def get_all_detection_data(image_bytes: bytes, image_ref: Optional[types.File] = None) -> Dict:
+    """
+    Uses Gemini to identify ALL objects, faces, and text regions.
+    Returns a clean dictionary for main.py to process.
+
+    This is deliberately one combined call: object, face, and text-region
+    detection share the same image and schema, so splitting them would only
+    double the network round-trips (text *content* is read by OCR.Space in
+    image_processor, not by Gemini). Calls are funneled through the
+    micro-batcher above, so concurrent requests may share one API call.
+
+    Args:
+        image_bytes: Raw image bytes
+        image_ref: Optional pre-uploaded Files API handle; avoids re-sending
+            the image inline when the pipeline uploaded it once already
+
+    Returns:
+        Dictionary containing detected_objects list and face metadata
+    """
+    cache_key = _image_cache_key(image_bytes)
+    cached = _DETECTION_CACHE.get(cache_key)
+    if cached is not None:
+        logger.debug("⚡ Detection cache hit for %s… — skipping Gemini call", cache_key[:12])
+        return cached
+
+    image_part = image_ref if image_ref is not None else _make_image_part(_shrink_for_gemini(image_bytes))
+
+    try:
+        result = await _submit_detection(image_part)
+
+        # Only successful detections are cached; error fallbacks (including
+        # padded batch slots) stay retryable
+        if not result.get("_detection_failed"):
+            _DETECTION_CACHE[cache_key] = result
         return result
-        
+
     except json.JSONDecodeError as e:
-        print(f"❌ Gemini response JSON parsing error: {e}")
-        print(f"Raw response: {response.text if 'response' in locals() else 'No response'}")
-        return {
-            "detected_objects": [],
-            "face_count": 0,
-            "detected_emotion": None
-        }
+        logger.warning("❌ Gemini response JSON parsing error: %s", e)
+        return _empty_detection_result()
     except Exception as e:
-        print(f"❌ Gemini all detection error: {e}")
-        import traceback
-        traceback.print_exc()
-        return {
-            "detected_objects": [],
-            "face_count": 0,
-            "detected_emotion": None
-        }
+        logger.exception("❌ Gemini all detection error: %s", e)
+        return _empty_detection_result()
+
 
 
 # ----------------------------------------------------------------------
 # 2. FINAL FEEDBACK FUNCTION (Phase 2)
 # ----------------------------------------------------------------------
 
-def generate_final_feedback(
-    image_bytes: bytes,
-    analysis_data: Dict
-) -> Dict[str, any]:
+# Fixed outer shape of the metrics payload; per-request values are substituted
+# into the slots, so the skeleton is never re-serialized. The payload is
+# machine-read by the model, so it stays compact — indentation whitespace
+# would only add prompt tokens (and prefill latency) for nothing. Newlines
+# between top-level keys are kept for structure.
+_METRICS_TEMPLATE = Template('{"average_brightness":$brightness,\n'
+                             '"contrast_level":$contrast,\n'
+                             '"dominant_colors":$dominant_colors,\n'
+                             '"word_count_ocr_RESULT":$word_count,\n'
+                             '"text_content_ocr_RESULT":$text_content,\n'
+                             '"face_count":$face_count,\n'
+                             '"dominant_emotion":$dominant_emotion,\n'
+                             '"detected_faces":$detected_faces,\n'
+                             '"key_object_contrasts":$key_object_contrasts}')
+
+
+# Static system prompt for the feedback call — built once, reused every request.
+FEEDBACK_SYSTEM_PROMPT = """You are an Elite YouTube Thumbnail Optimization AI. Your suggestions MUST be data-driven, highly specific, and focused exclusively on optimizing the Click-Through Rate (CTR) and visual psychology.
+
+    CRITICAL INSTRUCTIONS:
+    1. Provide an objective attractiveness score (0-100).
+    2. Generate exactly 5 concise, actionable suggestions.
+    3. **MANDATORY EXCLUSIONS:** Do NOT use the words 'vignette', 'sharpen', 'brightness', or 'highlight' as core verbs. Use professional, marketing-focused terms instead (e.g., 'Increase the visual disparity...', 'Amplify rim lighting...', 'Boost visibility...').
+    4. **NARRATIVE FOCUS:** Analyze the emotional and visual contrast between the main subjects. Suggestions MUST address how to optimize the psychological tension.
+    5. **DATA FOCUS:** If any Key Object Contrast Score is below 0.85, the first suggestion MUST be a technical fix to raise the contrast of that specific element.
+    6. Use specific, quantifiable techniques (e.g., 'Isolate the subject with a 2-stop exposure drop in the background')."""
+
+
+def _prepare_feedback_call(
+    analysis_data: Dict,
+    image_ref: Optional[types.File] = None,
+    image_bytes: bytes = b''
+) -> Tuple[list, types.GenerateContentConfig, tuple]:
     """
-    Generates attractiveness score and suggestions using the final, processed data.
-    
-    Args:
-        image_bytes: Raw image bytes
-        analysis_data: Dictionary containing all CV metrics and detection results
-    
-    Returns:
-        Dictionary with 'attractiveness_score' and 'ai_suggestions'
+    Builds the (contents, config, cache_key) triple for a feedback call.
+
+    Shared by the blocking and streaming feedback paths so the prompt
+    assembly, metrics serialization, and cache-key derivation stay in one
+    place. The Files API handle is the primary image reference; raw bytes
+    are only needed when no handle exists (inline fallback) or for
+    content-addressed cache keying.
     """
-    
+    if image_ref is None and not image_bytes:
+        raise ValueError("Either image_ref or image_bytes must be provided")
     # ----------------------------------------------------------------
     # DYNAMIC LABEL EXTRACTION: Inject specific object names into the prompt
     # ----------------------------------------------------------------
-    detected_faces = analysis_data.get('detected_faces', [])
-    detected_objects = analysis_data.get('detected_objects', [])
-    
+    # Read analysis_data exactly once into locals — no repeated .get() method
+    # calls below, and the caller's dict is never mutated.
+    detected_faces: List[FaceDict] = analysis_data.get('detected_faces', [])
+    cropped_image_bytes = analysis_data.get('cropped_image_bytes', b'')
+    average_brightness = analysis_data.get('average_brightness', 0)
+    contrast_level = analysis_data.get('contrast_level', 0)
+    dominant_colors = analysis_data.get('dominant_colors', [])
+    word_count = analysis_data.get('word_count', 0)
+    text_content = analysis_data.get('text_content', 'None')
+    face_count = analysis_data.get('face_count', 0)
+    detected_emotion = analysis_data.get('detected_emotion', 'N/A')
+    prompt_faces = analysis_data.get('prompt_faces', [])
+    prompt_object_contrasts = analysis_data.get('prompt_object_contrasts', [])
+
     # Construct dynamic narrative critique points for faces
     if len(detected_faces) >= 2:
         face_narrative = (
@@ -334,53 +722,39 @@ def generate_final_feedback(
         )
     else:
         face_narrative = "No prominent faces detected. Focus on object composition and text readability."
-    
-    # ----------------------------------------------------------------
-    # SYSTEM PROMPT: Maximally Refined
-    # ----------------------------------------------------------------
-    system_prompt = """You are an Elite YouTube Thumbnail Optimization AI. Your suggestions MUST be data-driven, highly specific, and focused exclusively on optimizing the Click-Through Rate (CTR) and visual psychology.
-
-    CRITICAL INSTRUCTIONS:
-    1. Provide an objective attractiveness score (0-100).
-    2. Generate exactly 5 concise, actionable suggestions.
-    3. **MANDATORY EXCLUSIONS:** Do NOT use the words 'vignette', 'sharpen', 'brightness', or 'highlight' as core verbs. Use professional, marketing-focused terms instead (e.g., 'Increase the visual disparity...', 'Amplify rim lighting...', 'Boost visibility...').
-    4. **NARRATIVE FOCUS:** Analyze the emotional and visual contrast between the main subjects. Suggestions MUST address how to optimize the psychological tension.
-    5. **DATA FOCUS:** If any Key Object Contrast Score is below 0.85, the first suggestion MUST be a technical fix to raise the contrast of that specific element.
-    6. Use specific, quantifiable techniques (e.g., 'Isolate the subject with a 2-stop exposure drop in the background')."""
 
-    image_part = types.Part.from_bytes(data=image_bytes, mime_type='image/jpeg')
+    image_part = image_ref if image_ref is not None else _make_image_part(_shrink_for_gemini(image_bytes))
+    # Prefer the content hash; a bare file handle keys on its server name
+    image_key = _image_cache_key(image_bytes) if image_bytes else (image_ref.name or '')
 
     # Get the CROPPED image bytes (for text focus)
-    cropped_text_bytes = analysis_data.get('cropped_image_bytes', b'')
-    cropped_text_part = types.Part.from_bytes(data=cropped_text_bytes, mime_type='image/jpeg') if cropped_text_bytes else image_part
-    
+    cropped_text_part = _make_image_part(cropped_image_bytes) if cropped_image_bytes else image_part
+
     # ----------------------------------------------------------------
     # USER PROMPT: Dynamic Input Payload
     # ----------------------------------------------------------------
-    metrics_json = json.dumps({
-        "average_brightness": round(analysis_data.get('average_brightness', 0), 2),
-        "contrast_level": round(analysis_data.get('contrast_level', 0), 2),
-        "dominant_colors": analysis_data.get('dominant_colors', []),
-        "word_count_ocr_RESULT": analysis_data.get('word_count', 0),
-        "text_content_ocr_RESULT": analysis_data.get('text_content', 'None'), 
-        "face_count": analysis_data.get('face_count', 0),
-        "dominant_emotion": analysis_data.get('detected_emotion', 'N/A'),
-        "detected_faces": [
-            {
-                "emotion": face.get("emotion", "Unknown"),
-                "position": face.get("position", "unknown"),
-                "contrast_vs_bg": round(face.get("contrast_score_vs_bg", 0.5), 2)
-            }
-            for face in detected_faces
-        ],
-        "key_object_contrasts": [
-            {
-                "label": obj.get("label", "Unknown"),
-                "contrast_vs_bg": round(obj.get("contrast_score_vs_bg", 0.5), 2)
-            }
-            for obj in detected_objects
-        ]
-    }, indent=2)
+    # Only the values are serialized per request; the fixed outer shape comes
+    # from _METRICS_TEMPLATE built once at import.
+    metrics_json = _METRICS_TEMPLATE.substitute(
+        brightness=round(average_brightness, 2),
+        contrast=round(contrast_level, 2),
+        dominant_colors=_json_dumps(dominant_colors),
+        word_count=word_count,
+        text_content=_json_dumps(text_content),
+        face_count=face_count,
+        dominant_emotion=_json_dumps(detected_emotion),
+        # Summaries are pre-shaped (and pre-rounded) by run_full_analysis,
+        # so no per-element reshaping happens here
+        detected_faces=_json_dumps(prompt_faces),
+        key_object_contrasts=_json_dumps(prompt_object_contrasts)
+    )
+
+    # Feedback depends on both the image and the metrics payload, so the
+    # cache key covers both.
+    cache_key = (
+        image_key,
+        hashlib.blake2b(metrics_json.encode(), digest_size=16).hexdigest()
+    )
 
     user_prompt = f"""
     Analyze the visual composition in the image. Use the provided original image and the cropped text image for visual context.
@@ -395,48 +769,192 @@ def generate_final_feedback(
 
     Based on all inputs, provide your score and 5 specific, non-generic suggestions in the required JSON format.
     """
-    
-    # Use clean schema
-    response_schema = get_clean_schema_for_gemini(LLMFeedback)
-    
+
+    config = types.GenerateContentConfig(
+        system_instruction=FEEDBACK_SYSTEM_PROMPT,
+        temperature=0.8,
+        response_mime_type="application/json",
+        response_schema=_FEEDBACK_SCHEMA,
+        max_output_tokens=1024  # Score + 5 suggestions is small; caps decode latency
+    )
+
+    return [image_part, cropped_text_part, user_prompt], config, cache_key
+
+
+async def generate_final_feedback(
+    analysis_data: Dict,
+    image_ref: Optional[types.File] = None,
+    image_bytes: bytes = b''
+) -> Dict[str, any]:
+    """
+    Generates attractiveness score and suggestions using the final, processed data.
+
+    Args:
+        analysis_data: Dictionary containing all CV metrics and detection results
+        image_ref: Pre-uploaded Files API handle; the image is never re-sent
+            inline when this is present
+        image_bytes: Raw image bytes — only consulted for cache keying and
+            as the inline fallback when no handle exists
+
+    Returns:
+        Dictionary with 'attractiveness_score' and 'ai_suggestions'
+    """
+    contents, config, cache_key = _prepare_feedback_call(analysis_data, image_ref, image_bytes)
+
+    cached = _FEEDBACK_CACHE.get(cache_key)
+    if cached is not None:
+        logger.debug("⚡ Feedback cache hit — skipping Gemini call")
+        return cached
+
     try:
-        response = client.models.generate_content(
+        response = await _generate_with_retry(
             model="gemini-2.0-flash-exp",
-            contents=[image_part, cropped_text_part, user_prompt],
-            config=types.GenerateContentConfig(
-                system_instruction=system_prompt,
-                temperature=0.8,
-                response_mime_type="application/json",
-                response_schema=response_schema
-            )
+            contents=contents,
+            config=config
         )
-        
-        result_json = json.loads(response.text)
-        feedback = LLMFeedback(**result_json)
-        
-        return {
+
+        # Pydantic v2 parses + validates the JSON bytes in one Rust-side
+        # pass — no intermediate dict or kwargs unpack.
+        feedback = LLMFeedback.model_validate_json(response.text)
+
+        result = {
             'attractiveness_score': feedback.attractiveness_score,
             'ai_suggestions': feedback.ai_suggestions
         }
-        
-    except json.JSONDecodeError as e:
-        print(f"❌ Gemini feedback JSON parsing error: {e}")
-        print(f"Raw response: {response.text if 'response' in locals() else 'No response'}")
+        # Only real feedback is cached; fallbacks stay retryable
+        _FEEDBACK_CACHE[cache_key] = result
+        return result
+
+    except ValidationError as e:
+        logger.warning("❌ Gemini feedback failed schema validation: %s — raw response: %s",
+                       e, response.text if 'response' in locals() else 'No response')
         return _get_fallback_feedback()
     except Exception as e:
-        print(f"❌ Gemini API error during feedback generation: {e}")
+        logger.warning("❌ Gemini API error during feedback generation (%s): %s", type(e).__name__, e)
         return _get_fallback_feedback()
 
 
+# Incremental extraction from the partially received feedback JSON. The
+# response schema is flat ({score, [5 strings]}), so two regexes are enough —
+# no need to pull in a streaming-JSON dependency for this shape.
+# The trailing delimiter guarantees the number is complete — a chunk
+# boundary mid-number would otherwise emit a truncated score.
+_SCORE_RE = re.compile(r'"attractiveness_score"\s*:\s*(\d+)\s*[,}\]]')
+_SUGGESTIONS_HEAD_RE = re.compile(r'"ai_suggestions"\s*:\s*\[')
+_JSON_STRING_RE = re.compile(r'"(?:[^"\\]|\\.)*"')
+
+
+async def generate_final_feedback_stream(
+    analysis_data: Dict,
+    image_ref: Optional[types.File] = None,
+    image_bytes: bytes = b''
+):
+    """
+    Streaming variant of generate_final_feedback.
+
+    Yields event dicts as soon as each piece of the response decodes:
+    {'event': 'score', ...} once attractiveness_score arrives, one
+    {'event': 'suggestion', ...} per completed suggestion, and a final
+    {'event': 'complete', 'result': {...}} with the same payload the
+    blocking variant returns. Total generation time is unchanged; the
+    win is time-to-first-byte for a user-facing consumer (e.g. SSE).
+    """
+    contents, config, cache_key = _prepare_feedback_call(analysis_data, image_ref, image_bytes)
+
+    cached = _FEEDBACK_CACHE.get(cache_key)
+    if cached is not None:
+        logger.debug("⚡ Feedback cache hit — replaying cached events")
+        yield {'event': 'score', 'attractiveness_score': cached['attractiveness_score']}
+        for index, suggestion in enumerate(cached['ai_suggestions']):
+            yield {'event': 'suggestion', 'index': index, 'text': suggestion}
+        yield {'event': 'complete', 'result': cached}
+        return
+
+    buffer = ''
+    score_sent = False
+    suggestions_sent = 0
+    try:
+        # No mid-stream retry: once tokens have been yielded the call cannot
+        # be transparently restarted, so stream errors fall through to the
+        # fallback instead of the backoff loop.
+        async with _GEMINI_SEM:
+            stream = await _get_client().aio.models.generate_content_stream(
+                model="gemini-2.0-flash-exp",
+                contents=contents,
+                config=config
+            )
+            async for chunk in stream:
+                if not chunk.text:
+                    continue
+                buffer += chunk.text
+
+                if not score_sent:
+                    score_match = _SCORE_RE.search(buffer)
+                    if score_match:
+                        score_sent = True
+                        yield {'event': 'score', 'attractiveness_score': int(score_match.group(1))}
+
+                head = _SUGGESTIONS_HEAD_RE.search(buffer)
+                if head:
+                    # Key order is not guaranteed, so literals after the
+                    # array's closing bracket (e.g. the trailing
+                    # "attractiveness_score" key) must not leak out as
+                    # suggestions. Between array elements only commas and
+                    # whitespace appear, so a ']' in the gap before a literal
+                    # means the array ended there.
+                    region = buffer[head.end():]
+                    literals = []
+                    scan_pos = 0
+                    for match in _JSON_STRING_RE.finditer(region):
+                        if ']' in region[scan_pos:match.start()]:
+                            break
+                        literals.append(match.group(0))
+                        scan_pos = match.end()
+                    for literal in literals[suggestions_sent:]:
+                        yield {
+                            'event': 'suggestion',
+                            'index': suggestions_sent,
+                            # json round-trip unescapes \" and \n sequences
+                            'text': _json_loads(literal)
+                        }
+                        suggestions_sent += 1
+
+        feedback = LLMFeedback.model_validate_json(buffer)
+        result = {
+            'attractiveness_score': feedback.attractiveness_score,
+            'ai_suggestions': feedback.ai_suggestions
+        }
+        _FEEDBACK_CACHE[cache_key] = result
+        yield {'event': 'complete', 'result': result}
+
+    except ValidationError as e:
+        logger.warning("❌ Streamed Gemini feedback failed schema validation: %s", e)
+        yield {'event': 'complete', 'result': _get_fallback_feedback()}
+    except Exception as e:
+        logger.warning("❌ Gemini API error during streamed feedback (%s): %s", type(e).__name__, e)
+        yield {'event': 'complete', 'result': _get_fallback_feedback()}
+
+
+# Static suggestion pool for the fallback path, built once at import.
+# The fallback fires exactly when the API is struggling, so it should not
+# re-allocate its strings per call.
+_FALLBACK_SUGGESTIONS = (
+    "AI feedback generation failed (API error or timeout).",
+    "Ensure your key subject has maximum contrast against the background.",
+    "Simplify text to 3-5 words for better mobile visibility.",
+    "Use high-contrast color combinations (e.g., yellow text on black).",
+    "Crop the main subject to fill at least 70% of the thumbnail area."
+)
+
+
 def _get_fallback_feedback() -> Dict[str, any]:
-    """Returns fallback feedback when Gemini API fails."""
+    """Returns fallback feedback when Gemini API fails.
+
+    The private marker lets callers keep degraded verdicts out of their
+    caches, matching how the feedback cache itself only stores real results.
+    """
     return {
         'attractiveness_score': 45,
-        'ai_suggestions': [
-            "AI feedback generation failed (API error or timeout).",
-            "Ensure your key subject has maximum contrast against the background.",
-            "Simplify text to 3-5 words for better mobile visibility.",
-            "Use high-contrast color combinations (e.g., yellow text on black).",
-            "Crop the main subject to fill at least 70% of the thumbnail area."
-        ]
+        'ai_suggestions': list(_FALLBACK_SUGGESTIONS),
+        '_fallback': True
     }
\ No newline at end of file
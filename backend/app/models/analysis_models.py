@@ -1,7 +1,43 @@
 # backend/app/models/analysis_models.py
 
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter
+from typing import List, Optional, TypedDict
+
+# The single authoritative model surface. Every consumer imports from here,
+# so each schema is built (and eagerly model_rebuilt below) exactly once per
+# process — no shadow copies of overlapping model definitions to pay for.
+__all__ = [
+    "FaceDict", "ObjectDict",
+    "DetectedElement", "DETECTED_ELEMENT_LIST_ADAPTER", "DetectedFace",
+    "GeminiAllDetection", "TextBlock", "GeminiTextDetection",
+    "LLMFeedback", "AnalysisResult",
+]
+
+# --- SHUTTLED DICT SHAPES (plain dicts, no validation round-trip) ---
+# These describe the dicts passed between image_processor and llm_generator.
+# They are intentionally TypedDicts, not BaseModels: the data is produced and
+# consumed internally, so paying Pydantic validation on every hop is wasted work.
+
+class FaceDict(TypedDict, total=False):
+    """Shape of a processed face dict shuttled through the analysis pipeline."""
+    label: str
+    bbox_normalized: List[int]
+    confidence: float
+    emotion: str
+    contrast_score_vs_bg: float
+    position: str
+    element_type: str
+
+
+class ObjectDict(TypedDict, total=False):
+    """Shape of a processed object dict shuttled through the analysis pipeline."""
+    label: str
+    bbox_normalized: List[int]
+    confidence: float
+    contrast_score_vs_bg: float
+    position: str
+    element_type: str
+
 
 # --- RAW DETECTION MODEL (OUTPUT OF GEMINI CALL 1 - Before local CV processing) ---
 
@@ -11,6 +47,10 @@ class DetectedElement(BaseModel):
     This model is simple to avoid conflict and allows the contrast field to be optional
     because contrast is calculated *locally* later.
     """
+    # Hot model: validated per detection per request. Unknown keys are
+    # dropped instead of kept, and instances are immutable once built.
+    model_config = ConfigDict(extra='ignore', frozen=True)
+
     label: str = Field(..., description="Element label (e.g., 'face', 'OpenAI logo', 'text_overlay')")
     bbox_normalized: List[int] = Field(..., description="Bounding box [xmin, ymin, xmax, ymax] normalized to 0-1000")
     confidence: float = Field(..., ge=0.0, le=1.0, description="Detection confidence score")
@@ -20,6 +60,11 @@ class DetectedElement(BaseModel):
     element_type: Optional[str] = Field(None, description="Type of element: 'face', 'object', or 'text'")
 
 
+# Shared bulk adapter: validates or dumps a whole detection list in one
+# pydantic-core call instead of per-element Python loops. Built once at import.
+DETECTED_ELEMENT_LIST_ADAPTER = TypeAdapter(List[DetectedElement])
+
+
 class DetectedFace(BaseModel):
     """
     Represents a detected face with emotion and position data.
@@ -64,7 +109,9 @@ class GeminiTextDetection(BaseModel):
 
 class LLMFeedback(BaseModel):
     """Response model for final LLM analysis feedback."""
-    model_config = ConfigDict(extra='allow')
+    # Gemini output is schema-constrained; anything extra is noise we would
+    # only pay to keep, so drop rather than retain unknown fields.
+    model_config = ConfigDict(extra='ignore')
     attractiveness_score: int = Field(..., ge=0, le=100, description="Overall attractiveness score (0-100)")
     ai_suggestions: List[str] = Field(..., min_length=5, max_length=5, description="Exactly 5 actionable suggestions")
 
@@ -75,6 +122,8 @@ class LLMFeedback(BaseModel):
 
 class AnalysisResult(BaseModel):
     """Complete analysis result returned to the client."""
+    model_config = ConfigDict(extra='ignore', frozen=True)
+
     # CV Metrics
     average_brightness: float = Field(..., description="Average brightness (0-255)")
     contrast_level: float = Field(..., description="Overall contrast (std dev of grayscale)")
@@ -94,4 +143,15 @@ class AnalysisResult(BaseModel):
     
     # AI Feedback
     attractiveness_score: int = Field(..., description="AI-generated attractiveness score (0-100)")
-    ai_suggestions: List[str] = Field(..., description="5 actionable improvement suggestions")
\ No newline at end of file
+    ai_suggestions: List[str] = Field(..., description="5 actionable improvement suggestions")
+
+
+# Build every pydantic-core validator eagerly at import. Schemas otherwise
+# finish resolving lazily on first validation, which lands a one-time spike
+# inside the first request after each worker boots instead of in startup.
+for _model in (
+    DetectedElement, DetectedFace, GeminiAllDetection,
+    TextBlock, GeminiTextDetection, LLMFeedback, AnalysisResult,
+):
+    _model.model_rebuild(force=True)
+del _model
\ No newline at end of file